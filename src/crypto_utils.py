@@ -1,14 +1,43 @@
 """Cryptographic helpers used across the project."""
 
+import functools
 import hashlib
-import hmac
+
+# Resolved once; hashlib already uses OpenSSL's SHA-NI/AVX2 code when present
+_sha256 = hashlib.sha256
+
+_BLOCK_SIZE = 64
+_IPAD = bytes(x ^ 0x36 for x in range(256))
+_OPAD = bytes(x ^ 0x5C for x in range(256))
+
+
+@functools.lru_cache(maxsize=32)
+def _hmac_prepared(key: str):
+    """Return (inner, outer) SHA-256 states already fed the padded key."""
+    key_bytes = key.encode("utf-8")
+    if len(key_bytes) > _BLOCK_SIZE:
+        key_bytes = _sha256(key_bytes).digest()
+    key_bytes = key_bytes.ljust(_BLOCK_SIZE, b"\0")
+    return _sha256(key_bytes.translate(_IPAD)), _sha256(key_bytes.translate(_OPAD))
+
+
+def _hmac_with(prepared, data: bytes) -> bytes:
+    """Finish HMAC-SHA256 of data from precomputed key states."""
+    ipad_hash, opad_hash = prepared
+    inner = ipad_hash.copy()
+    inner.update(data)
+    outer = opad_hash.copy()
+    outer.update(inner.digest())
+    return outer.digest()
 
 
 def compute_hash(data: bytes) -> bytes:
     """Return SHA-256 digest bytes."""
-    return hashlib.sha256(data).digest()
+    return _sha256(data).digest()
 
 
 def compute_hmac(data: bytes, key: str) -> bytes:
     """Return HMAC-SHA256 bytes using the given secret key."""
-    return hmac.new(key.encode("utf-8"), data, hashlib.sha256).digest()
+    # Faster than the one-shot hmac.digest(): the cached key states skip the
+    # two key-block compressions hmac.digest() redoes on every call.
+    return _hmac_with(_hmac_prepared(key), data)
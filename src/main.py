@@ -5,18 +5,25 @@ Usage:
     python main.py encode --text "Hello" --out hello.png
     python main.py encode --infile secret.txt --out secret.png --key mysecret
     python main.py encode --text "Hello" --out hello.png --url "https://example.com/view"
+    python main.py encode-batch a.txt b.txt c.txt --key mysecret
     python main.py decode --img hello.png
     python main.py decode --img hello.png --key mysecret
 """
 import argparse
 import sys
-import base64
 from pathlib import Path
 
-from qr_generator import generate_qr_from_text, generate_qr_from_file
-from qr_verifier import decode_qr_image, verify_payload
+try:
+    import pybase64 as b64  # optional SIMD base64
+except ImportError:
+    import base64 as b64
+
+# qr_generator/qr_verifier pull in qrcode, PIL and pyzbar; they are imported
+# inside the command that needs them so --help and the other command start fast.
 
 def cmd_encode(args):
+    from qr_generator import generate_qr_from_file, generate_qr_from_text
+
     if not args.text and not args.infile:
         print("Provide --text or --infile", file=sys.stderr)
         sys.exit(2)
@@ -31,7 +38,36 @@ def cmd_encode(args):
     else:
         generate_qr_from_text(args.text, out_file, key=args.key, url=args.url)
 
+def cmd_encode_batch(args):
+    from qr_generator import generate_qr_batch, read_message_file
+
+    infiles = [Path(p) for p in args.infiles]
+    for infile in infiles:
+        if not infile.exists():
+            print("Input file not found:", infile, file=sys.stderr)
+            sys.exit(2)
+
+    try:
+        messages = [read_message_file(infile) for infile in infiles]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    # Keep the extension in the name so x.txt and x.pdf do not collide
+    out_files = [
+        Path(f"{infile.stem}{infile.suffix.replace('.', '_')}_qr.png")
+        for infile in infiles
+    ]
+    try:
+        generate_qr_batch(
+            messages, out_files, key=args.key, url=args.url, workers=args.workers
+        )
+    except (ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
 def cmd_decode(args):
+    from qr_verifier import decode_qr_image, verify_payload
+
     img_path = Path(args.img)
     if not img_path.exists():
         print("Image file not found:", img_path, file=sys.stderr)
@@ -48,17 +84,21 @@ def cmd_decode(args):
     if valid:
         print("✅ Verification successful")
         if message:
+            # Decode once; text messages fail here or in the utf-8 check
             try:
-                decoded = base64.b64decode(message, validate=True)
-                decoded.decode('utf-8')
+                decoded = b64.b64decode(message, validate=True)
+            except ValueError:
+                decoded = None
+
+            if decoded is None:
                 print("Message:", message)
-            except Exception:
+            else:
                 try:
-                    decoded = base64.b64decode(message, validate=True)
+                    decoded.decode('utf-8')
+                    print("Message:", message)
+                except UnicodeDecodeError:
                     Path('restored.bin').write_bytes(decoded)
                     print("Binary file restored to: restored.bin")
-                except Exception:
-                    print("Message:", message)
         if meta:
             print(f"Mode: {meta.get('mode')}, Time: {meta.get('ts')}")
     else:
@@ -77,6 +117,14 @@ def main():
     enc.add_argument('--key', help='Secret key for HMAC (optional)')
     enc.add_argument('--url', help='URL to embed payload in (optional)')
 
+    batch = sub.add_parser('encode-batch', help='Create one secure QR per input file')
+    batch.add_argument('infiles', nargs='+', help='Files to embed')
+    batch.add_argument('--key', help='Secret key for HMAC (optional)')
+    batch.add_argument('--url', help='URL to embed payload in (optional)')
+    batch.add_argument(
+        '--workers', type=int, help='Worker processes (default: CPU count)'
+    )
+
     dec = sub.add_parser('decode', help='Decode and verify QR')
     dec.add_argument('--img', required=True, help='QR image to decode')
     dec.add_argument('--key', help='Secret key if HMAC was used')
@@ -84,6 +132,8 @@ def main():
     args = parser.parse_args()
     if args.cmd == 'encode':
         cmd_encode(args)
+    elif args.cmd == 'encode-batch':
+        cmd_encode_batch(args)
     elif args.cmd == 'decode':
         cmd_decode(args)
 
@@ -0,0 +1,71 @@
+"""Codeword construction for single-segment byte-mode QR codes."""
+
+import functools
+
+from qrcode import base, util
+from qrcode.LUT import rsPoly_LUT
+
+_PAD = bytes([util.PAD0, util.PAD1])
+
+
+@functools.lru_cache(maxsize=None)
+def _rs_table(ec_count: int) -> tuple[int, ...]:
+    """Return generator-polynomial multiples for every feedback byte.
+
+    Entry f is (f * g(x)) without its leading term, packed big-endian into
+    one int, so a division step is a shift plus a single XOR.
+    """
+    gen_log = [base.glog(c) for c in rsPoly_LUT[ec_count][1:]]
+    table = [0]
+    for f in range(1, 256):
+        lf = base.glog(f)
+        row = bytes(base.gexp(lf + g) for g in gen_log)
+        table.append(int.from_bytes(row, "big"))
+    return tuple(table)
+
+
+def _rs_remainder(block: bytes, ec_count: int) -> bytes:
+    """Return the Reed-Solomon error correction bytes for one block."""
+    table = _rs_table(ec_count)
+    shift = 8 * (ec_count - 1)
+    mask = (1 << (8 * ec_count)) - 1
+    rem = 0
+    for b in block:
+        rem = ((rem << 8) & mask) ^ table[b ^ (rem >> shift)]
+    return rem.to_bytes(ec_count, "big")
+
+
+def byte_mode_codewords(data: bytes, version: int, error_correction: int) -> list[int]:
+    """Return the interleaved data + EC codewords for one byte-mode segment.
+
+    Same result as qrcode.util.create_data for a single MODE_8BIT_BYTE
+    QRData, without going through BitBuffer one bit at a time.
+    """
+    rs_blocks = base.rs_blocks(version, error_correction)
+    data_total = sum(block.data_count for block in rs_blocks)
+
+    # 4-bit mode, length field, data, then a 4-bit terminator. The header
+    # is 12 or 20 bits, so adding the terminator lands on a byte boundary.
+    count_bits = util.length_in_bits(util.MODE_8BIT_BYTE, version)
+    if (4 + count_bits) // 8 + len(data) + 1 > data_total:
+        raise ValueError(f"Data too long for version {version}")
+    header = (util.MODE_8BIT_BYTE << count_bits) | len(data)
+    bits = (header << (8 * len(data)) | int.from_bytes(data, "big")) << 4
+    stream = bits.to_bytes((4 + count_bits + 4) // 8 + len(data), "big")
+    pad = data_total - len(stream)
+    stream += _PAD * (pad // 2) + _PAD[: pad % 2]
+
+    dc_blocks = []
+    ec_blocks = []
+    offset = 0
+    for block in rs_blocks:
+        dc = stream[offset : offset + block.data_count]
+        offset += block.data_count
+        dc_blocks.append(dc)
+        ec_blocks.append(_rs_remainder(dc, block.total_count - block.data_count))
+
+    out = []
+    for blocks in (dc_blocks, ec_blocks):
+        for i in range(max(len(b) for b in blocks)):
+            out.extend(b[i] for b in blocks if i < len(b))
+    return out
@@ -1,58 +1,198 @@
 """QR generation and payload building."""
 
+import functools
 import os
-import base64
-import json
-from datetime import datetime, timezone
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from urllib.parse import urlsplit, urlunsplit
 
 import qrcode
+from PIL import Image
+from qrcode import util as qr_util
+
+try:
+    import pybase64 as b64  # optional SIMD base64
+except ImportError:
+    import base64 as b64
 
 from crypto_utils import compute_hash, compute_hmac
+from qr_codewords import byte_mode_codewords
+from qr_penalty import lost_point
 
 
-def _get_qrcode_assets_dir() -> Path:
-    """Get/create assets/qrCode directory."""
-    override = os.getenv("SECURE_QR_ASSETS_DIR")
-    if override:
-        assets_dir = Path(override)
-        assets_dir.mkdir(parents=True, exist_ok=True)
-        return assets_dir
-
-    project_root = Path(__file__).resolve().parents[1]
-    assets_dir = project_root / "assets" / "qrCode"
+# Constant pieces of the JSON envelope, prebuilt per mode.
+_ENVELOPE_HEAD = {
+    mode: b'{"v":1,"mode":"' + mode.encode("ascii") + b'","mac":"'
+    for mode in ("hash", "hmac")
+}
+_ENVELOPE_MSG = b'","msg_b64":"'
+_ENVELOPE_TS = b'","ts":"'
+_ENVELOPE_TAIL = b'"}'
+
+# base64 maps each 3-byte group independently, so the 3-byte-aligned part
+# of the head encodes to a fixed prefix that is computed once here.
+_ENVELOPE_HEAD_B64 = {}
+_ENVELOPE_HEAD_REST = {}
+for _mode, _head in _ENVELOPE_HEAD.items():
+    _cut = len(_head) - len(_head) % 3
+    _ENVELOPE_HEAD_B64[_mode] = b64.urlsafe_b64encode(_head[:_cut]).decode("ascii")
+    _ENVELOPE_HEAD_REST[_mode] = _head[_cut:]
+del _mode, _head, _cut
+
+_BOX_SIZE = 6
+_BORDER = 2
+
+# Byte-mode capacity of each version (1..40) at error correction level Q.
+_Q_BYTE_CAPACITY = [
+    (
+        qr_util.BIT_LIMIT_TABLE[qrcode.constants.ERROR_CORRECT_Q][v]
+        - 4
+        - qr_util.length_in_bits(qr_util.MODE_8BIT_BYTE, v)
+    )
+    // 8
+    for v in range(1, 41)
+]
+
+
+def _q_byte_version(data_len: int) -> int:
+    """Return the smallest QR version that holds data_len bytes at level Q."""
+    version = bisect_left(_Q_BYTE_CAPACITY, data_len) + 1
+    if version > 40:
+        raise RuntimeError(
+            f"Payload too large for QR code: {data_len} bytes "
+            f"(max {_Q_BYTE_CAPACITY[-1]})"
+        )
+    return version
+
+
+def _min_payload_len(message_len: int) -> int:
+    """Return a lower bound on the payload length for a message size.
+
+    The message is base64-encoded inside the envelope and the envelope is
+    base64-encoded again, so oversized files can be rejected from their
+    size alone, before they are hashed or encoded.
+    """
+    msg_b64_len = 4 * -(-message_len // 3)
+    return 4 * -(-msg_b64_len // 3)
+
+
+# Largest message with _min_payload_len() within the version 40 capacity
+_MAX_MESSAGE_LEN = 3 * (3 * (_Q_BYTE_CAPACITY[-1] // 4) // 4)
+
+
+_ASSETS_DIR = Path(__file__).resolve().parents[1] / "assets" / "qrCode"
+
+
+@functools.cache
+def _ensure_assets_dir(override: str | None) -> Path:
+    """Create the assets directory once per location and return it."""
+    assets_dir = Path(override) if override else _ASSETS_DIR
     assets_dir.mkdir(parents=True, exist_ok=True)
     return assets_dir
 
 
-def _make_payload_bytes(message_bytes: bytes, key: str | None) -> str:
+def _get_qrcode_assets_dir() -> Path:
+    """Get/create assets/qrCode directory."""
+    return _ensure_assets_dir(os.getenv("SECURE_QR_ASSETS_DIR"))
+
+
+_ts_cache: tuple[int, bytes] = (-1, b"")
+
+
+def _utc_timestamp(precise_ts: bool = False) -> bytes:
+    """Return the current UTC time in ISO format as ASCII bytes.
+
+    By default the string is truncated to whole seconds and reused for all
+    payloads built within the same second; precise_ts keeps microseconds.
+    Formatted from time.gmtime() to avoid building datetime objects.
+    """
+    global _ts_cache
+    if precise_ts:
+        sec, ns = divmod(time.time_ns(), 1_000_000_000)
+        t = time.gmtime(sec)
+        return b"%04d-%02d-%02dT%02d:%02d:%02d.%06d+00:00" % (*t[:6], ns // 1000)
+    sec = int(time.time())
+    if sec != _ts_cache[0]:
+        t = time.gmtime(sec)
+        _ts_cache = (sec, b"%04d-%02d-%02dT%02d:%02d:%02d+00:00" % t[:6])
+    return _ts_cache[1]
+
+
+def _build_payload(
+    message_bytes: bytes, mode: str, mac: bytes, precise_ts: bool = False
+) -> str:
+    """Wrap message and MAC into the JSON envelope and return base64 string.
+
+    All field values are ASCII without JSON-special characters, so the
+    envelope is joined directly instead of going through json.dumps.
+    """
+    ts = _utc_timestamp(precise_ts)
+    j = b"".join(
+        [
+            _ENVELOPE_HEAD_REST[mode],
+            b64.b64encode(mac),
+            _ENVELOPE_MSG,
+            b64.b64encode(message_bytes),
+            _ENVELOPE_TS,
+            ts,
+            _ENVELOPE_TAIL,
+        ]
+    )
+    return _ENVELOPE_HEAD_B64[mode] + b64.urlsafe_b64encode(j).decode("ascii")
+
+
+def _make_payload_bytes(
+    message_bytes: bytes, key: str | None, precise_ts: bool = False
+) -> str:
     """Create secure payload with hash/HMAC and return base64 string."""
-    ts = datetime.now(timezone.utc).isoformat()
     if key:
-        mac_b64 = base64.b64encode(compute_hmac(message_bytes, key)).decode("ascii")
-        mode = "hmac"
-    else:
-        mac_b64 = compute_hash(message_bytes).hex()
-        mode = "hash"
-
-    payload = {
-        "v": 1,
-        "mode": mode,
-        "mac": mac_b64,
-        "msg_b64": base64.b64encode(message_bytes).decode("ascii"),
-        "ts": ts,
-    }
-    j = json.dumps(payload, separators=(",", ":")).encode("utf-8")
-    return base64.urlsafe_b64encode(j).decode("ascii")
+        mac = compute_hmac(message_bytes, key)
+        return _build_payload(message_bytes, "hmac", mac, precise_ts)
+    mac = compute_hash(message_bytes)
+    return _build_payload(message_bytes, "hash", mac, precise_ts)
 
 
 def _embed_payload_in_url(url: str, payload_b64: str) -> str:
     """Add payload as 'data' query parameter to URL."""
-    p = urlparse(url)
-    q = dict(parse_qsl(p.query))
-    q["data"] = payload_b64
-    return urlunparse((p.scheme, p.netloc, p.path, p.params, urlencode(q), p.fragment))
+    if "?" not in url and "#" not in url:
+        # urlsafe base64 ([A-Za-z0-9_-=]) needs no escaping in a query value
+        return f"{url}?data={payload_b64}"
+    # Keep the existing query as-is, only replacing any previous 'data' field
+    p = urlsplit(url)
+    fields = [f for f in p.query.split("&") if f and f.partition("=")[0] != "data"]
+    fields.append(f"data={payload_b64}")
+    return urlunsplit((p.scheme, p.netloc, p.path, "&".join(fields), p.fragment))
+
+
+def _render_modules(modules: list[list[bool]]) -> Image.Image:
+    """Rasterize a QR module matrix into a 1-bit black-on-white image.
+
+    One byte per module is built row by row and scaled up with NEAREST,
+    instead of drawing every dark module as a rectangle.
+    """
+    size = len(modules) + 2 * _BORDER
+    quiet_row = b"\xff" * size
+    quiet_side = b"\xff" * _BORDER
+    rows = [quiet_row] * _BORDER
+    for row in modules:
+        rows.append(quiet_side + bytes(0 if dark else 255 for dark in row) + quiet_side)
+    rows.extend([quiet_row] * _BORDER)
+
+    img = Image.frombytes("L", (size, size), b"".join(rows)).convert("1")
+    return img.resize((size * _BOX_SIZE, size * _BOX_SIZE), Image.NEAREST)
+
+
+class _QRCode(qrcode.QRCode):
+    """QRCode that scores the 8 mask candidates with qr_penalty.lost_point."""
+
+    def best_mask_pattern(self):
+        scores = []
+        for pattern in range(8):
+            self.makeImpl(True, pattern)
+            scores.append(lost_point(self.modules))
+        return scores.index(min(scores))
 
 
 def _generate_qr_img(data_str: str, out_path: Path) -> Path:
@@ -62,20 +202,25 @@ def _generate_qr_img(data_str: str, out_path: Path) -> Path:
     assets_dir = _get_qrcode_assets_dir()
     final_path = assets_dir / filename
 
-    qr = qrcode.QRCode(
-        version=None,
+    # Payloads are base64/URL text, always encoded in byte mode, so the
+    # version comes straight from the capacity table instead of a fit search,
+    # and the codewords are built directly instead of via qrcode's BitBuffer.
+    data = data_str.encode("utf-8")
+    version = _q_byte_version(len(data))
+    qr = _QRCode(
+        version=version,
         error_correction=qrcode.constants.ERROR_CORRECT_Q,
-        box_size=6,
-        border=2,
+        box_size=_BOX_SIZE,
+        border=_BORDER,
+    )
+    qr.data_cache = byte_mode_codewords(
+        data, version, qrcode.constants.ERROR_CORRECT_Q
     )
-    qr.add_data(data_str)
-    try:
-        qr.make(fit=True)
-    except ValueError as e:
-        raise RuntimeError(f"Payload too large for QR code: {e}")
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(final_path)
+    qr.make(fit=False)
+
+    # QR images are read by scanners, not archived; fast deflate is enough
+    img = _render_modules(qr.modules)
+    img.save(final_path, compress_level=1)
     return final_path
 
 
@@ -84,24 +229,92 @@ def generate_qr_from_text(
     out_path: Path,
     key: str | None = None,
     url: str | None = None,
+    precise_ts: bool = False,
 ):
     """Generate QR from text, save to assets/qrCode/."""
-    payload_b64 = _make_payload_bytes(text.encode("utf-8"), key)
+    text_bytes = text.encode("utf-8")
+    if len(text_bytes) > _MAX_MESSAGE_LEN:
+        raise RuntimeError(
+            f"Payload too large for QR code: text is {len(text_bytes)} bytes"
+        )
+    payload_b64 = _make_payload_bytes(text_bytes, key, precise_ts)
     data = _embed_payload_in_url(url, payload_b64) if url else payload_b64
     final = _generate_qr_img(data, out_path)
     print(f"Generated QR saved at: {final}")
 
 
+def read_message_file(infile: Path) -> bytes:
+    """Read a message file, rejecting input too large for a QR code."""
+    # Bounded read: st_size is 0 for pipes and devices, so the size check
+    # is done on what is actually read, without reading oversized input.
+    with open(infile, "rb") as f:
+        message_bytes = f.read(_MAX_MESSAGE_LEN + 1)
+    if len(message_bytes) > _MAX_MESSAGE_LEN:
+        raise RuntimeError(
+            f"Payload too large for QR code: '{infile}' is over "
+            f"{_MAX_MESSAGE_LEN} bytes"
+        )
+    return message_bytes
+
+
 def generate_qr_from_file(
     infile: Path,
     out_path: Path,
     key: str | None = None,
     url: str | None = None,
+    precise_ts: bool = False,
 ):
     """Generate QR from file bytes, save to assets/qrCode/."""
-    with open(infile, "rb") as f:
-        message_bytes = f.read()
-    payload_b64 = _make_payload_bytes(message_bytes, key)
+    message_bytes = read_message_file(infile)
+    payload_b64 = _make_payload_bytes(message_bytes, key, precise_ts)
     data = _embed_payload_in_url(url, payload_b64) if url else payload_b64
     final = _generate_qr_img(data, out_path)
     print(f"Generated QR for file '{infile}' saved at: {final}")
+
+
+def generate_qr_batch(
+    messages: list[str | bytes],
+    out_paths: list[Path],
+    key: str | None = None,
+    url: str | None = None,
+    precise_ts: bool = False,
+    workers: int | None = None,
+) -> list[Path]:
+    """Generate one QR per message, save to assets/qrCode/.
+
+    Payloads are built in this process. QR encoding and PNG writing are
+    independent per item and CPU-bound, so they run in a process pool of
+    `workers` processes (default: CPU count).
+    Every item is size-checked before any hashing or image writing, so an
+    oversized message fails the whole batch without partial output.
+    """
+    if len(messages) != len(out_paths):
+        raise ValueError("messages and out_paths must have the same length")
+    # Images are saved by file name into one directory; duplicates would
+    # silently overwrite each other
+    names = [Path(o).name or "secure_qr.png" for o in out_paths]
+    if len(set(names)) != len(names):
+        raise ValueError("out_paths must have distinct file names")
+
+    raw = [m.encode("utf-8") if isinstance(m, str) else m for m in messages]
+    for i, m in enumerate(raw):
+        if len(m) > _MAX_MESSAGE_LEN:
+            raise RuntimeError(
+                f"Payload too large for QR code: message {i} is {len(m)} bytes"
+            )
+    payloads = [_make_payload_bytes(m, key, precise_ts) for m in raw]
+    datas = [_embed_payload_in_url(url, p) if url else p for p in payloads]
+    # The URL can still push a payload over; check before writing any image
+    for d in datas:
+        _q_byte_version(len(d.encode("utf-8")))
+
+    workers = min(workers or os.cpu_count() or 1, len(datas))
+    if workers <= 1:
+        finals = [_generate_qr_img(d, o) for d, o in zip(datas, out_paths)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            finals = list(pool.map(_generate_qr_img, datas, out_paths))
+
+    for final in finals:
+        print(f"Generated QR saved at: {final}")
+    return finals
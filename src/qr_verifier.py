@@ -1,33 +1,131 @@
 """QR decoding and payload verification."""
 
 import base64
-import json
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from urllib.parse import parse_qs, urlparse
+from typing import TYPE_CHECKING, BinaryIO
+from urllib.parse import unquote_plus, urlsplit
 
-from PIL import Image
-from pyzbar.pyzbar import decode as qr_decode
+try:
+    from orjson import loads as json_loads  # optional faster JSON parser
+except ImportError:
+    from json import loads as json_loads
 
 from crypto_utils import compute_hash, compute_hmac
 
+# PIL and pyzbar are only imported once an image is actually decoded, so
+# verify_payload-only callers (the tests, the web verify step) skip them.
+if TYPE_CHECKING:
+    from PIL import Image
+
+# JPEG uploads are decoded at the smallest 1/2^n scale that is still at least
+# this size (see Image.draft); a 4032x3024 phone photo decodes at 2016x1512
+_DRAFT_SIZE = (1024, 1024)
+
+# Retries after the first pass run on a copy at most this many pixels a side
+_MAX_WORK_SIDE = 1024
+
+# Rescaled retries are skipped when they would exceed this many pixels a side,
+# so only small sources (under 800 px for 2x, 400 px for 4x) are upscaled
+_MAX_UPSCALE_SIDE = 1600
+
+
+def _otsu_threshold(img: "Image.Image") -> int:
+    """Return the Otsu threshold of a grayscale image."""
+    hist = img.histogram()
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best, best_var = 0, 0.0
+    for t, h in enumerate(hist):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * h
+        diff = sum_bg / weight_bg - (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * diff * diff
+        if var > best_var:
+            best, best_var = t, var
+    return best
+
+
+def _filter3(gray: "Image.Image", op) -> "Image.Image":
+    """Apply a 3x3 min/max filter as two separable passes of ImageChops op.
+
+    Same result as ImageFilter.MinFilter(3)/MaxFilter(3) away from the edges
+    (offset() wraps around), at a fraction of the cost.
+    """
+    from PIL import ImageChops
+
+    h = op(op(gray, ImageChops.offset(gray, 1, 0)), ImageChops.offset(gray, -1, 0))
+    return op(op(h, ImageChops.offset(h, 0, 1)), ImageChops.offset(h, 0, -1))
+
 
-def decode_qr_image(img_path: Path) -> str:
-    """Decode QR image and return payload string."""
-    img = Image.open(img_path)
-    decoded = qr_decode(img)
-    if not decoded:
+def _decode_candidates(gray: "Image.Image"):
+    """Yield the image, then progressively heavier clean-ups of it.
+
+    Each variant is only built if the previous ones did not decode, so
+    clean images cost a single zbar pass. The retries run on a bounded
+    working copy so failing decodes of large images stay cheap.
+    """
+    from PIL import Image, ImageChops, ImageOps
+
+    yield gray
+    if max(gray.size) > _MAX_WORK_SIDE:
+        gray = gray.copy()
+        gray.thumbnail((_MAX_WORK_SIDE, _MAX_WORK_SIDE))
+    yield ImageOps.invert(gray)
+    yield ImageOps.autocontrast(gray, cutoff=2)
+    threshold = _otsu_threshold(gray)
+    yield gray.point(lambda p: 255 if p > threshold else 0)
+    w, h = gray.size
+    for scale in (0.5, 2.0, 4.0):
+        size = (int(w * scale), int(h * scale))
+        if min(size) >= 64 and max(size) <= _MAX_UPSCALE_SIDE:
+            yield gray.resize(size, Image.LANCZOS)
+    yield _filter3(gray, ImageChops.darker)
+    yield _filter3(gray, ImageChops.lighter)
+
+
+def decode_qr_image(img_path: Path | BinaryIO) -> str:
+    """Decode QR image (path or binary file object) and return payload string."""
+    from PIL import Image
+    from pyzbar.pyzbar import ZBarSymbol
+    from pyzbar.pyzbar import decode as qr_decode
+
+    # Convert to grayscale once; zbar would otherwise convert per attempt.
+    # For JPEGs, draft() lets libjpeg decode straight to reduced-size
+    # grayscale, which is much cheaper for large phone photos.
+    with Image.open(img_path) as img:
+        img.draft("L", _DRAFT_SIZE)
+        gray = img.convert("L")
+    for candidate in _decode_candidates(gray):
+        decoded = qr_decode(candidate, symbols=[ZBarSymbol.QRCODE])
+        if decoded:
+            break
+    else:
         raise RuntimeError("No QR code found in image.")
-    raw = decoded[0].data.decode("utf-8")
+    return _extract_payload(decoded[0].data.decode("utf-8"))
 
-    # Extract payload from URL if present
+
+def _extract_payload(raw: str) -> str:
+    """Return the 'data' query value if raw is an http(s) URL, else raw."""
+    # Plain payloads are the common case; skip URL parsing for them
+    if not raw[:8].lower().startswith(("http://", "https://")):
+        return raw
     try:
-        p = urlparse(raw)
-        if p.scheme in ("http", "https"):
-            qs = parse_qs(p.query)
-            if "data" in qs:
-                return qs["data"][0]
-    except Exception:
-        pass
+        query = urlsplit(raw).query
+    except ValueError:
+        return raw
+    for field in query.split("&"):
+        name, _, value = field.partition("=")
+        if name == "data" and value:
+            return unquote_plus(value)
     return raw
 
 
@@ -38,7 +136,7 @@ def verify_payload(payload_b64: str, key: str | None = None):
     """
     try:
         j = base64.urlsafe_b64decode(payload_b64)
-        payload = json.loads(j)
+        payload = json_loads(j)
     except Exception as e:
         return False, None, None, f"Invalid payload: {e}"
 
@@ -72,14 +170,50 @@ def verify_payload(payload_b64: str, key: str | None = None):
             provided = base64.b64decode(mac_field)
         except Exception:
             return False, None, None, "Invalid HMAC encoding"
-        if expected == provided:
+        if hmac.compare_digest(expected, provided):
             return True, message, meta, None
         return False, message, meta, "HMAC mismatch - wrong key or tampered"
 
     if mode == "hash":
-        expected_hex = compute_hash(message_bytes).hex()
-        if expected_hex == mac_field:
+        expected = compute_hash(message_bytes)
+        # Older payloads store the digest as 64 hex chars, newer ones as base64
+        try:
+            if len(mac_field) == 64:
+                provided = bytes.fromhex(mac_field)
+            else:
+                provided = base64.b64decode(mac_field)
+        except Exception:
+            return False, None, None, "Invalid hash encoding"
+        if hmac.compare_digest(expected, provided):
             return True, message, meta, None
         return False, message, meta, "Hash mismatch - content tampered"
 
     return False, None, None, f"Unknown mode: {mode}"
+
+
+def _decode_and_verify(img_path: Path, key: str | None):
+    """Decode one QR image and verify its payload."""
+    try:
+        payload = decode_qr_image(img_path)
+    except Exception as e:
+        return False, None, None, f"Failed to decode QR: {e}"
+    return verify_payload(payload, key=key)
+
+
+def verify_qr_batch(
+    img_paths: list[Path],
+    key: str | None = None,
+    workers: int | None = None,
+):
+    """Decode and verify several QR images.
+
+    Images are independent, so they are handled in a process pool of
+    `workers` processes (default: CPU count).
+
+    Returns: list of verify_payload results, in input order
+    """
+    workers = min(workers or os.cpu_count() or 1, len(img_paths))
+    if workers <= 1:
+        return [_decode_and_verify(p, key) for p in img_paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_decode_and_verify, img_paths, [key] * len(img_paths)))
@@ -0,0 +1,26 @@
+import random
+
+from qrcode import constants, util
+
+from qr_codewords import byte_mode_codewords
+
+
+def test_matches_qrcode_create_data():
+    rng = random.Random(0)
+    levels = (
+        constants.ERROR_CORRECT_L,
+        constants.ERROR_CORRECT_M,
+        constants.ERROR_CORRECT_Q,
+        constants.ERROR_CORRECT_H,
+    )
+    for level in levels:
+        for version in (1, 2, 9, 10, 26, 27, 40):
+            for n in (0, 7, 100):
+                data = bytes(rng.randrange(256) for _ in range(n))
+                try:
+                    expected = util.create_data(
+                        version, level, [util.QRData(data, mode=util.MODE_8BIT_BYTE)]
+                    )
+                except Exception:
+                    continue
+                assert byte_mode_codewords(data, version, level) == expected
@@ -1,7 +1,16 @@
+import os
 from pathlib import Path
 
-from qr_generator import generate_qr_from_text
-from qr_verifier import decode_qr_image, verify_payload
+import pytest
+
+import qr_generator
+from qr_generator import (
+    _embed_payload_in_url,
+    generate_qr_batch,
+    generate_qr_from_file,
+    generate_qr_from_text,
+)
+from qr_verifier import decode_qr_image, verify_payload, verify_qr_batch
 
 
 def test_generate_and_verify(tmp_path: Path, monkeypatch):
@@ -16,3 +25,114 @@ def test_generate_and_verify(tmp_path: Path, monkeypatch):
     valid, message, meta, reason = verify_payload(payload, key=None)
     assert valid
     assert "test-message" in message
+
+
+def test_generate_batch(tmp_path: Path, monkeypatch):
+    assets_dir = tmp_path / "qrCode"
+    monkeypatch.setenv("SECURE_QR_ASSETS_DIR", str(assets_dir))
+
+    texts = ["one", "two", "three"]
+    outs = [tmp_path / f"{t}.png" for t in texts]
+    finals = generate_qr_batch(texts, outs, key="k", workers=2)
+
+    assert [f.name for f in finals] == ["one.png", "two.png", "three.png"]
+    for text, final in zip(texts, finals):
+        valid, message, _, _ = verify_payload(decode_qr_image(final), key="k")
+        assert valid
+        assert message == text
+
+
+def test_batch_rejects_duplicate_names(tmp_path: Path):
+    outs = [tmp_path / "a" / "x.png", tmp_path / "b" / "x.png"]
+    with pytest.raises(ValueError, match="distinct"):
+        generate_qr_batch(["one", "two"], outs)
+
+
+def test_oversized_payload_rejected(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SECURE_QR_ASSETS_DIR", str(tmp_path / "qrCode"))
+    monkeypatch.setattr(qr_generator, "compute_hash", None)
+    with pytest.raises(RuntimeError, match="too large"):
+        generate_qr_from_text("x" * 5000, tmp_path / "big.png")
+
+
+def test_oversized_batch_rejected_before_writing(tmp_path: Path, monkeypatch):
+    assets_dir = tmp_path / "qrCode"
+    monkeypatch.setenv("SECURE_QR_ASSETS_DIR", str(assets_dir))
+    monkeypatch.setattr(qr_generator, "compute_hmac", None)
+    messages = ["a", "x" * 5000, "c", "d"]
+    out_paths = [tmp_path / f"{i}.png" for i in range(len(messages))]
+    with pytest.raises(RuntimeError, match="message 1"):
+        generate_qr_batch(messages, out_paths, key="k", workers=2)
+    assert not any(assets_dir.glob("*.png"))
+
+
+def test_embed_payload_in_url():
+    from urllib.parse import parse_qs, urlparse
+
+    urls = (
+        "https://example.com/view",
+        "https://example.com/view?a=1#top",
+        "https://example.com/view?data=old&a=1",
+    )
+    for url in urls:
+        embedded = _embed_payload_in_url(url, "eyJ2Ijox==")
+        assert parse_qs(urlparse(embedded).query)["data"] == ["eyJ2Ijox=="]
+
+
+def test_oversized_file_rejected_before_hashing(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SECURE_QR_ASSETS_DIR", str(tmp_path / "qrCode"))
+    infile = tmp_path / "big.bin"
+    infile.write_bytes(b"\0" * 4096)
+    monkeypatch.setattr(qr_generator, "compute_hash", None)
+    with pytest.raises(RuntimeError, match="too large"):
+        generate_qr_from_file(infile, tmp_path / "big.png")
+
+
+def _open_as_pipe(monkeypatch, data: bytes):
+    """Make qr_generator's open() return a pipe holding data (st_size 0)."""
+    r, w = os.pipe()
+    os.write(w, data)
+    os.close(w)
+    monkeypatch.setattr(
+        qr_generator, "open", lambda path, mode: os.fdopen(r, mode), raising=False
+    )
+
+
+def test_generate_from_pipe(tmp_path: Path, monkeypatch):
+    captured = []
+    monkeypatch.setattr(
+        qr_generator, "_generate_qr_img", lambda data, out: captured.append(data)
+    )
+    _open_as_pipe(monkeypatch, b"hello from a pipe")
+    generate_qr_from_file(tmp_path / "pipe", tmp_path / "pipe.png")
+
+    valid, message, _, _ = verify_payload(captured[0])
+    assert valid and message == "hello from a pipe"
+
+
+def test_oversized_pipe_rejected(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(qr_generator, "compute_hash", None)
+    _open_as_pipe(monkeypatch, b"\0" * 4096)
+    with pytest.raises(RuntimeError, match="too large"):
+        generate_qr_from_file(tmp_path / "big", tmp_path / "big.png")
+
+
+def test_max_message_len_matches_bound():
+    cap = qr_generator._Q_BYTE_CAPACITY[-1]
+    n = qr_generator._MAX_MESSAGE_LEN
+    assert qr_generator._min_payload_len(n) <= cap
+    assert qr_generator._min_payload_len(n + 1) > cap
+
+
+def test_verify_batch(tmp_path: Path, monkeypatch):
+    assets_dir = tmp_path / "qrCode"
+    monkeypatch.setenv("SECURE_QR_ASSETS_DIR", str(assets_dir))
+
+    texts = ["alpha", "beta", "gamma"]
+    finals = generate_qr_batch(texts, [tmp_path / f"{t}.png" for t in texts], key="k")
+    finals.append(tmp_path / "missing.png")
+
+    results = verify_qr_batch(finals, key="k", workers=2)
+    assert [r[1] for r in results[:3]] == texts
+    assert all(r[0] for r in results[:3])
+    assert not results[3][0]
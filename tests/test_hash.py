@@ -1,3 +1,6 @@
+import hashlib
+import hmac
+
 from crypto_utils import compute_hash, compute_hmac
 
 
@@ -10,3 +13,10 @@ def test_hmac_different_keys():
     h1 = compute_hmac(b"msg", "key1")
     h2 = compute_hmac(b"msg", "key2")
     assert h1 != h2
+
+
+def test_hmac_matches_stdlib():
+    for key in ("k", "x" * 100, "ключ"):
+        for data in (b"", b"msg", b"y" * 5000):
+            expected = hmac.new(key.encode("utf-8"), data, hashlib.sha256).digest()
+            assert compute_hmac(data, key) == expected
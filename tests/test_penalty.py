@@ -0,0 +1,24 @@
+import random
+
+import qrcode
+from qrcode import util
+
+from qr_penalty import lost_point
+
+
+def test_matches_qrcode_on_real_matrices():
+    for version in (1, 7, 20, 40):
+        for mask in range(8):
+            qr = qrcode.QRCode(version=version)
+            qr.add_data("penalty")
+            qr.makeImpl(True, mask)
+            assert lost_point(qr.modules) == util.lost_point(qr.modules)
+
+
+def test_matches_qrcode_on_random_matrices():
+    rng = random.Random(0)
+    for n in (11, 21, 45):
+        for _ in range(20):
+            p = rng.random()
+            modules = [[rng.random() < p for _ in range(n)] for _ in range(n)]
+            assert lost_point(modules) == util.lost_point(modules)
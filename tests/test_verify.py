@@ -1,8 +1,9 @@
 import base64
+import hashlib
 import json
 
 from qr_generator import _make_payload_bytes
-from qr_verifier import verify_payload
+from qr_verifier import _decode_candidates, _extract_payload, verify_payload
 
 
 def test_tamper_detection():
@@ -14,3 +15,53 @@ def test_tamper_detection():
     valid, _, _, reason = verify_payload(tampered, key=None)
     assert not valid
     assert "mismatch" in reason.lower()
+
+
+def test_payload_envelope_is_json():
+    payload_b64 = _make_payload_bytes(b"hello", key="k")
+    j = json.loads(base64.urlsafe_b64decode(payload_b64))
+    assert list(j) == ["v", "mode", "mac", "msg_b64", "ts"]
+    assert j["v"] == 1
+    assert j["mode"] == "hmac"
+    assert base64.b64decode(j["msg_b64"]) == b"hello"
+
+
+def test_payload_envelope_matches_json_dumps():
+    for key in (None, "k"):
+        raw = base64.urlsafe_b64decode(_make_payload_bytes(b"\x00\xffdata", key=key))
+        j = json.loads(raw)
+        assert raw == json.dumps(j, separators=(",", ":")).encode("utf-8")
+
+
+def test_legacy_hex_hash_payload():
+    msg = b"legacy"
+    payload = {
+        "v": 1,
+        "mode": "hash",
+        "mac": hashlib.sha256(msg).hexdigest(),
+        "msg_b64": base64.b64encode(msg).decode("ascii"),
+        "ts": "2024-01-01T00:00:00+00:00",
+    }
+    payload_b64 = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    valid, message, _, _ = verify_payload(payload_b64, key=None)
+    assert valid
+    assert message == "legacy"
+
+
+def test_extract_payload_from_url():
+    assert _extract_payload("eyJ2Ijox") == "eyJ2Ijox"
+    assert _extract_payload("https://example.com/view?data=eyJ2Ijox==") == "eyJ2Ijox=="
+    assert _extract_payload("HTTP://example.com/?a=1&data=eyJ%3D#top") == "eyJ="
+    no_data = "https://example.com/view?a=1"
+    assert _extract_payload(no_data) == no_data
+    malformed = "http://[abc/?data=x"
+    assert _extract_payload(malformed) == malformed
+
+
+def test_decode_retries_use_bounded_copy():
+    from PIL import Image
+
+    gray = Image.new("L", (3000, 2000), 255)
+    sizes = [c.size for c in _decode_candidates(gray)]
+    assert sizes[0] == (3000, 2000)
+    assert all(max(size) <= 1024 for size in sizes[1:])
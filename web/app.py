@@ -1,5 +1,6 @@
 # web/app.py
 from flask import Flask, render_template, request, redirect, url_for, send_file, flash
+from werkzeug.utils import secure_filename
 from pathlib import Path
 import base64
 import sys
@@ -24,12 +25,11 @@ def index():
             flash("Please choose an image file.", "error")
             return redirect(url_for("index"))
 
-        # save uploaded file
-        tmp_path = UPLOAD_DIR / file.filename
-        file.save(tmp_path)
+        # decode straight from the upload stream; only restored files hit disk
+        filename = secure_filename(file.filename or "") or "upload"
 
         try:
-            payload = decode_qr_image(tmp_path)
+            payload = decode_qr_image(file.stream)
         except Exception as e:
             # If the uploaded image contains no QR, show a friendly message
             msg = str(e)
@@ -74,7 +74,7 @@ def index():
 
             # If it's a file, save it for download
             if is_file and file_bytes:
-                dp = UPLOAD_DIR / (file.filename + ".restored")
+                dp = UPLOAD_DIR / (filename + ".restored")
                 dp.write_bytes(file_bytes)
                 download_name = dp.name
 